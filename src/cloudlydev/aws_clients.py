@@ -0,0 +1,151 @@
+import inspect
+from threading import Lock
+from unittest.mock import patch
+
+import boto3
+import botocore.session
+from botocore.config import Config
+
+
+DEFAULT_REGION = "us-east-1"
+
+# Services whose models are always loaded at startup, handlers almost
+# always talk to at least one of them.
+PRELOADED_SERVICES = ("dynamodb", "s3", "sqs")
+
+
+class ClientFactory:
+    """
+    Process wide cache of boto3 clients for local stand-ins.
+
+    Once installed, every client created on a botocore session gets keep-alive
+    connections, and clients for services listed under `endpoints` in the
+    Cloudlyfile are pointed at their local stand-in. Handlers keep their own
+    clients and event handlers, only the endpoint changes. cloudlydev's own
+    clients are cached per (service, region, endpoint). Everything shares the
+    default boto3 session, so the botocore service models are only loaded once.
+    """
+
+    def __init__(self, max_pool_connections=50):
+        self._clients = {}
+        self._endpoints = {}
+        self._lock = Lock()
+        self._patcher = None
+        self._client_config = Config(
+            max_pool_connections=max_pool_connections,
+            tcp_keepalive=True,
+        )
+
+    def configure(self, config):
+        self._endpoints = {**config.endpoints}
+
+    def endpoint_for(self, service_name):
+        return self._endpoints.get(service_name)
+
+    def install(self):
+        """
+        Patches botocore so clients created from now on, including the ones
+        built by handlers and boto3 resources, use the local endpoints.
+        """
+        if self._patcher is not None:
+            return
+
+        create_client = botocore.session.Session.create_client
+        signature = inspect.signature(create_client)
+        this = self
+
+        def create_local_client(*args, **kwargs):
+            call = signature.bind(*args, **kwargs)
+            call.arguments.update(
+                this._client_args(
+                    call.arguments["service_name"],
+                    endpoint_url=call.arguments.get("endpoint_url"),
+                    config=call.arguments.get("config"),
+                )
+            )
+            return create_client(*call.args, **call.kwargs)
+
+        self._patcher = patch(
+            "botocore.session.Session.create_client", new=create_local_client
+        )
+        self._patcher.start()
+
+    def uninstall(self):
+        if self._patcher is not None:
+            self._patcher.stop()
+            self._patcher = None
+
+    def client(self, service_name, region_name=None, endpoint_url=None):
+        region_name = region_name or self._region_name()
+        endpoint_url = endpoint_url or self.endpoint_for(service_name)
+        return self._cached(
+            ("client", service_name, region_name, endpoint_url),
+            lambda session: session.client(
+                service_name,
+                region_name=region_name,
+                **self._client_args(service_name, endpoint_url=endpoint_url),
+            ),
+        )
+
+    def resource(self, service_name, region_name=None, endpoint_url=None):
+        region_name = region_name or self._region_name()
+        endpoint_url = endpoint_url or self.endpoint_for(service_name)
+        return self._cached(
+            ("resource", service_name, region_name, endpoint_url),
+            lambda session: session.resource(
+                service_name,
+                region_name=region_name,
+                **self._client_args(service_name, endpoint_url=endpoint_url),
+            ),
+        )
+
+    def preload(self):
+        """
+        Loads the service models and builds a client for every configured
+        endpoint so the first call from a cold handler doesn't pay for it.
+        """
+        for service_name in dict.fromkeys((*PRELOADED_SERVICES, *self._endpoints)):
+            try:
+                self.client(service_name)
+            except Exception as e:
+                print(f"ERROR: {service_name} client failed to load", e)
+
+    def _cached(self, key, build):
+        cached = self._clients.get(key)
+        if cached is not None:
+            return cached
+
+        # Client creation is not thread safe, stream and cron threads
+        # may ask for the same client at the same time as a request.
+        with self._lock:
+            if key not in self._clients:
+                self._clients[key] = build(self._session())
+            return self._clients[key]
+
+    def _client_args(self, service_name, endpoint_url=None, config=None):
+        local_endpoint = self.endpoint_for(service_name)
+        endpoint_url = endpoint_url or local_endpoint
+
+        client_config = self._client_config
+        if local_endpoint and endpoint_url == local_endpoint and service_name == "s3":
+            # Local S3 stand-ins don't resolve bucket subdomains
+            client_config = client_config.merge(Config(s3={"addressing_style": "path"}))
+
+        # Settings the caller chose win over ours
+        if config is not None:
+            client_config = client_config.merge(config)
+
+        return {"endpoint_url": endpoint_url, "config": client_config}
+
+    def _region_name(self):
+        return self._session().region_name or DEFAULT_REGION
+
+    def _session(self):
+        # Share the default session so handlers calling boto3.client()
+        # reuse the service models we have already loaded.
+        if boto3.DEFAULT_SESSION is None:
+            boto3.setup_default_session()
+        return boto3.DEFAULT_SESSION
+
+
+clients = ClientFactory()
@@ -4,7 +4,7 @@ class CognitoIdentityProvider:
 
     def mock(self, method, **kwargs):
         result = self.Meta.method_responses.get(method, {})
-        override_user = self._config.get("user")
+        override_user = self._config.user if self._config else None
         if override_user:
             result = {**result, **override_user}
 
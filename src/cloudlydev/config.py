@@ -0,0 +1,386 @@
+import os
+import pickle
+from dataclasses import dataclass, field
+from typing import Iterator, Optional, Tuple
+
+import yaml
+
+# Prefer the libyaml bindings, they are much faster on large configs
+try:
+    from yaml import CSafeLoader as SafeLoader
+except ImportError:
+    from yaml import SafeLoader
+
+
+# Bump this whenever the compiled structures below change shape
+CACHE_VERSION = 2
+CACHE_DIR = ".cloudlydev"
+DEFAULT_PYTHON_VERSION = "3.11"
+
+
+class ConfigError(ValueError):
+    pass
+
+
+@dataclass(frozen=True)
+class LambdaFunction:
+    path: str
+    root: str
+    handler: str = "handler.handler"
+    python_version: str = DEFAULT_PYTHON_VERSION
+    venv: Optional[str] = None
+
+
+@dataclass(frozen=True)
+class Route:
+    url: str
+    method: str
+    function: LambdaFunction
+
+
+@dataclass(frozen=True)
+class CronJob:
+    interval: str
+    function: LambdaFunction
+
+
+@dataclass(frozen=True)
+class KeySchema:
+    pk: str
+    pk_type: str
+    sk: Optional[str] = None
+    sk_type: Optional[str] = None
+
+
+@dataclass(frozen=True)
+class Index:
+    name: str
+    key: KeySchema
+
+
+@dataclass(frozen=True)
+class Stream:
+    enabled: bool
+    view_type: str
+    batch_size: int
+    bindings: Tuple[LambdaFunction, ...] = ()
+
+
+@dataclass(frozen=True)
+class Table:
+    name: str
+    key: KeySchema
+    region: Optional[str] = None
+    indexes: Tuple[Index, ...] = ()
+    stream: Optional[Stream] = None
+
+
+@dataclass(frozen=True)
+class Config:
+    routes: Tuple[Route, ...] = ()
+    cron: Tuple[CronJob, ...] = ()
+    tables: Tuple[Table, ...] = ()
+    endpoints: dict = field(default_factory=dict)
+    user: dict = field(default_factory=dict)
+    client_id: str = "testclientid"
+
+    def functions(self) -> Iterator[LambdaFunction]:
+        for route in self.routes:
+            yield route.function
+        for job in self.cron:
+            yield job.function
+        for table in self.tables:
+            if table.stream:
+                yield from table.stream.bindings
+
+
+def load_yaml(path):
+    if os.path.exists(path):
+        with open(path) as f:
+            return yaml.load(f, Loader=SafeLoader) or {}
+    return {}
+
+
+def load_config(config_path) -> Config:
+    """
+    Returns the compiled config for `config_path`. The compiled config is
+    cached on disk and reused for as long as none of the files it was built
+    from have been modified.
+    """
+    config_path = os.path.abspath(config_path)
+    if not os.path.exists(config_path):
+        raise ConfigError(f"Config file {config_path} does not exist")
+
+    # The main root is relative to the working directory, so is the cache
+    cwd = os.getcwd()
+    cache_path = _cache_path(config_path)
+    config = _read_cache(cache_path, cwd)
+    if config is not None:
+        return config
+
+    sources, fragments = [], []
+    _read_config(config_path, sources, fragments)
+    config = _compile(fragments)
+    _write_cache(cache_path, cwd, sources, config)
+    return config
+
+
+def _read_config(path, sources, fragments, parent=None, chain=()):
+    if path in chain:
+        raise ConfigError(f"{path} includes itself")
+
+    if any(source == path for source, _ in sources):
+        # Included from more than one file, only merge it once
+        return
+
+    sources.append((path, os.stat(path).st_mtime_ns))
+    raw = load_yaml(path)
+    if not isinstance(raw, dict):
+        raise ConfigError(f"{path} must contain a mapping")
+
+    # The main root is relative to the working directory. Included files
+    # resolve their root against their own folder, or share the root of
+    # the file that included them.
+    base_dir = os.path.dirname(path)
+    if parent is None:
+        if not raw.get("root"):
+            raise ConfigError(f"{path}: root is required")
+        root = os.path.abspath(str(raw["root"]))
+    elif raw.get("root"):
+        root = os.path.normpath(os.path.join(base_dir, str(raw["root"])))
+    else:
+        root = parent["root"]
+
+    if parent is not None:
+        for key in ("user", "client_id"):
+            if key in raw:
+                raise ConfigError(f"{path}: {key} can only be set in the main config")
+
+    fragment = {
+        "path": path,
+        "raw": raw,
+        "root": root,
+        "python_version": _python_version(raw, path)
+        or (parent["python_version"] if parent else DEFAULT_PYTHON_VERSION),
+    }
+    fragments.append(fragment)
+
+    includes = raw.get("include") or []
+    if isinstance(includes, str):
+        includes = [includes]
+    if not isinstance(includes, list):
+        raise ConfigError(f"{path}: include must be a path or a list of paths")
+
+    for include in includes:
+        if not isinstance(include, str):
+            raise ConfigError(f"{path}: include {include!r} is not a path")
+
+        include_path = os.path.abspath(os.path.join(base_dir, include))
+        if not os.path.exists(include_path):
+            raise ConfigError(f"{path}: included file {include} does not exist")
+
+        _read_config(
+            include_path,
+            sources,
+            fragments,
+            parent=fragment,
+            chain=(*chain, path),
+        )
+
+
+def _compile(fragments) -> Config:
+    routes, cron, tables, endpoints = [], [], [], {}
+
+    for fragment in fragments:
+        path, raw = fragment["path"], fragment["raw"]
+
+        for route in _entries(raw, "routes", path):
+            if not isinstance(route.get("url"), str):
+                raise ConfigError(f"{path}: route {route.get('path')} needs a url")
+            routes.append(
+                Route(
+                    url=route["url"],
+                    method=str(route.get("method", "GET")),
+                    function=_function(route, fragment),
+                )
+            )
+
+        for job in _entries(raw, "cron", path):
+            cron.append(
+                CronJob(
+                    interval=str(job.get("interval", "1m")),
+                    function=_function(job, fragment),
+                )
+            )
+
+        if raw.get("table") is not None:
+            tables.append(_table(_mapping(raw, "table", path), fragment))
+        for table_def in _entries(raw, "tables", path):
+            tables.append(_table(table_def, fragment))
+
+        for service, url in _mapping(raw, "endpoints", path).items():
+            if endpoints.get(service, url) != url:
+                raise ConfigError(
+                    f"{path}: endpoint {url} for {service} "
+                    f"conflicts with {endpoints[service]}"
+                )
+            endpoints[service] = url
+
+    main = fragments[0]
+    return Config(
+        routes=tuple(routes),
+        cron=tuple(cron),
+        tables=tuple(tables),
+        endpoints=endpoints,
+        user={**_mapping(main["raw"], "user", main["path"])},
+        client_id=str(main["raw"].get("client_id") or "testclientid"),
+    )
+
+
+def _mapping(raw, key, path) -> dict:
+    value = raw.get(key)
+    if value is None:
+        return {}
+    if not isinstance(value, dict):
+        raise ConfigError(f"{path}: {key} must be a mapping")
+    return value
+
+
+def _entries(raw, key, path) -> list:
+    value = raw.get(key)
+    if value is None:
+        return []
+    if not isinstance(value, list) or not all(isinstance(v, dict) for v in value):
+        raise ConfigError(f"{path}: {key} must be a list of mappings")
+    return value
+
+
+def _python_version(raw, path):
+    value = raw.get("python_version")
+    if value is None or isinstance(value, str):
+        return value
+
+    # YAML reads an unquoted 3.9 as the float 3.9, which is fine, but it
+    # also reads 3.10 as 3.1. Minor versions below 6 can't be told apart
+    # from 3.10 to 3.50, so those have to be quoted.
+    version = str(value)
+    major, _, minor = version.partition(".")
+    if isinstance(value, float) and major == "3" and int(minor) >= 6:
+        return version
+
+    raise ConfigError(
+        f'{path}: python_version {value} is ambiguous, quote it, e.g. "3.10"'
+    )
+
+
+def _function(entry, fragment) -> LambdaFunction:
+    path = fragment["path"]
+    if not isinstance(entry.get("path"), str):
+        raise ConfigError(f"{path}: lambda {entry} is missing a path")
+
+    handler = entry.get("handler") or LambdaFunction.handler
+    if not isinstance(handler, str) or handler.count(".") != 1:
+        raise ConfigError(f"{path}: handler {handler!r} must look like module.function")
+
+    return LambdaFunction(
+        path=entry["path"],
+        root=fragment["root"],
+        handler=handler,
+        python_version=_python_version(entry, path) or fragment["python_version"],
+        venv=entry.get("venv"),
+    )
+
+
+def _table(table_def, fragment) -> Table:
+    path = fragment["path"]
+    name = table_def.get("name")
+    if not isinstance(name, str):
+        raise ConfigError(f"{path}: table is missing a name")
+
+    stream = None
+    if table_def.get("stream") is not None:
+        stream_def = _mapping(table_def, "stream", path)
+        stream = Stream(
+            enabled=bool(stream_def.get("enabled")),
+            view_type=stream_def.get("view_type") or "NEW_AND_OLD_IMAGES",
+            batch_size=stream_def.get("batch_size") or 100,
+            bindings=tuple(
+                _function(binding, fragment)
+                for binding in _entries(stream_def, "bindings", path)
+            ),
+        )
+
+    indexes = []
+    for index in _entries(table_def, "indexes", path):
+        if not isinstance(index.get("name"), str):
+            raise ConfigError(f"{path}: an index of {name} is missing a name")
+        indexes.append(
+            Index(name=index["name"], key=_key_schema(index, index["name"], path))
+        )
+
+    return Table(
+        name=name,
+        key=_key_schema(table_def, name, path),
+        region=table_def.get("region"),
+        indexes=tuple(indexes),
+        stream=stream,
+    )
+
+
+def _key_schema(definition, name, path) -> KeySchema:
+    key = definition.get("key")
+    if (
+        not isinstance(key, list)
+        or not 1 <= len(key) <= 2
+        or not all(isinstance(k, dict) or k is None for k in key)
+    ):
+        raise ConfigError(f"{path}: key of {name} must be a list of pk and sk")
+
+    pk = key[0] or {}
+    sk = (key[1] if len(key) > 1 else None) or {}
+    if not pk.get("pk"):
+        raise ConfigError(f"{path}: {name} is missing a partition key")
+
+    return KeySchema(
+        pk=pk["pk"],
+        pk_type=pk.get("type", "S"),
+        sk=sk.get("sk"),
+        sk_type=sk.get("type", "S") if sk.get("sk") else None,
+    )
+
+
+def _cache_path(config_path):
+    name = os.path.basename(config_path)
+    return os.path.join(os.path.dirname(config_path), CACHE_DIR, f"{name}.cache")
+
+
+def _read_cache(cache_path, cwd):
+    try:
+        with open(cache_path, "rb") as f:
+            version, cached_cwd, sources, config = pickle.load(f)
+    except Exception:
+        return None
+
+    if version != CACHE_VERSION or cached_cwd != cwd:
+        return None
+
+    for path, mtime in sources:
+        try:
+            if os.stat(path).st_mtime_ns != mtime:
+                return None
+        except OSError:
+            return None
+
+    return config
+
+
+def _write_cache(cache_path, cwd, sources, config):
+    try:
+        os.makedirs(os.path.dirname(cache_path), exist_ok=True)
+        tmp_path = f"{cache_path}.{os.getpid()}.tmp"
+        with open(tmp_path, "wb") as f:
+            pickle.dump((CACHE_VERSION, cwd, sources, config), f)
+        os.replace(tmp_path, cache_path)
+    except OSError as e:
+        # The cache is only an optimization, a read-only project still works
+        print(f"WARNING: could not write config cache {cache_path}", e)
@@ -1,40 +1,53 @@
 from datetime import datetime, timedelta
 from decimal import Decimal
 from typing import Any, Callable, Iterable
-import boto3
 import time
 
+from cloudlydev.aws_clients import clients
+from cloudlydev.config import Config, Index, Table
 
-dynamodb = boto3.resource("dynamodb", endpoint_url="http://localhost:8000")
 
+LOCAL_ENDPOINT = "http://localhost:8000"
 
-def reset_db(config, force=False):
-    table_def = config["table"]
-    pk, sk = table_def["key"]
-    gsi = table_def.get("indexes", [])
+
+def _endpoint_url():
+    return clients.endpoint_for("dynamodb") or LOCAL_ENDPOINT
+
+
+def _dynamodb():
+    return clients.resource("dynamodb", endpoint_url=_endpoint_url())
+
+
+def reset_db(config: Config, force=False):
+    for table in config.tables:
+        reset_table(table, force=force)
+
+
+def reset_table(table: Table, force=False):
+    key = table.key
 
     key_schema = [
-        {"AttributeName": pk["pk"], "KeyType": "HASH"},
+        {"AttributeName": key.pk, "KeyType": "HASH"},
     ]
 
     attr_defs = [
-        {"AttributeName": pk["pk"], "AttributeType": pk["type"]},
+        {"AttributeName": key.pk, "AttributeType": key.pk_type},
     ]
 
-    if sk and sk.get("sk"):
-        key_schema.append({"AttributeName": sk["sk"], "KeyType": "RANGE"})
-        attr_defs.append({"AttributeName": sk["sk"], "AttributeType": sk["type"]})
+    if key.sk:
+        key_schema.append({"AttributeName": key.sk, "KeyType": "RANGE"})
+        attr_defs.append({"AttributeName": key.sk, "AttributeType": key.sk_type})
 
-    indexes = create_indexes_params(gsi, attr_defs)
+    indexes = create_indexes_params(table.indexes, attr_defs)
 
     if force:
-        try_delete_db(table_def["name"])
+        try_delete_db(table.name)
 
-    print(f"Creating table {table_def['name']}")
+    print(f"Creating table {table.name}")
 
     # Create the DynamoDB table if it doesn't exist
     create_params = dict(
-        TableName=table_def["name"],
+        TableName=table.name,
         KeySchema=key_schema,
         AttributeDefinitions=attr_defs,
         BillingMode="PAY_PER_REQUEST",
@@ -45,22 +58,23 @@ def reset_db(config, force=False):
         },
     )
 
-    if table_def.get("stream"):
-        view_type = table_def["stream"].get("view_type")
+    if table.stream:
         create_params["StreamSpecification"] = {
             "StreamEnabled": True,
-            "StreamViewType": view_type or "NEW_AND_OLD_IMAGES",
-            "BatchSize": table_def["stream"].get("batch_size") or 100,
+            "StreamViewType": table.stream.view_type,
+            "BatchSize": table.stream.batch_size,
         }
+    dynamodb = _dynamodb()
     try:
         dynamodb.create_table(**create_params)
-        print(f"{table_def['name']} created!")
+        print(f"{table.name} created!")
     except dynamodb.meta.client.exceptions.ResourceInUseException:
-        print(f"{table_def['name']} already exists!")
+        print(f"{table.name} already exists!")
 
 
 def try_delete_db(table_name):
     print(f"Deleting table {table_name}")
+    dynamodb = _dynamodb()
     try:
         table = dynamodb.Table(table_name)
         table.delete()
@@ -69,33 +83,33 @@ def try_delete_db(table_name):
         print(f"{table_name} not found!")
 
 
-def create_indexes_params(gsi, attr_defs):
+def create_indexes_params(gsi: Iterable[Index], attr_defs):
     indexs = []
     for index in gsi:
-        pk, sk = index["key"]
+        key = index.key
         idx_key_schema = [
-            {"AttributeName": pk["pk"], "KeyType": "HASH"},
+            {"AttributeName": key.pk, "KeyType": "HASH"},
         ]
 
-        if sk and sk.get("sk"):
-            idx_key_schema.append({"AttributeName": sk["sk"], "KeyType": "RANGE"})
-            attr_defs.append({"AttributeName": sk["sk"], "AttributeType": sk["type"]})
+        if key.sk:
+            idx_key_schema.append({"AttributeName": key.sk, "KeyType": "RANGE"})
+            attr_defs.append({"AttributeName": key.sk, "AttributeType": key.sk_type})
 
         indexs.append(
             {
-                "IndexName": index["name"],
+                "IndexName": index.name,
                 "KeySchema": idx_key_schema,
                 "Projection": {"ProjectionType": "ALL"},
             }
         )
 
-        attr_defs.append({"AttributeName": pk["pk"], "AttributeType": pk["type"]})
+        attr_defs.append({"AttributeName": key.pk, "AttributeType": key.pk_type})
 
     return indexs
 
 
 def load_data(table_name, data):
-    table = dynamodb.Table(table_name)
+    table = _dynamodb().Table(table_name)
     with table.batch_writer() as batch:
         for item in data:
             batch.put_item(Item=_serialize(item))
@@ -115,15 +129,18 @@ def _serialize(item: dict):
 class DynamoDBLocalStream:
     def __init__(self, table_name):
         self._table_name = table_name
-        self._client = boto3.client(
-            "dynamodbstreams", endpoint_url="http://localhost:8000"
-        )
+
+        # Both clients must hit the same server and region, DynamoDB Local
+        # keeps tables and streams per region.
+        endpoint_url = _endpoint_url()
+        self._table_client = clients.client("dynamodb", endpoint_url=endpoint_url)
+        self._client = clients.client("dynamodbstreams", endpoint_url=endpoint_url)
         self._current_shard = 0
         self._stream_arn = self._get_stream_arn()
         self._shards = self._get_shards(self._stream_arn)
 
     def _get_stream_arn(self):
-        describe_table_response = dynamodb.meta.client.describe_table(
+        describe_table_response = self._table_client.describe_table(
             TableName=self._table_name
         )
         return describe_table_response["Table"]["LatestStreamArn"]
@@ -2,31 +2,26 @@ from collections import defaultdict
 import os
 import sys
 from unittest.mock import patch
-import yaml
 import importlib
 import botocore
 from threading import Thread
 from argparse import ArgumentParser
 
 from bottle import request, run, Bottle, response
+from cloudlydev.aws_clients import clients
 from cloudlydev.aws_mocks.mocker import mock_for
+from cloudlydev.config import LambdaFunction, load_config, load_yaml
 from cloudlydev.dynamodb import DynamoStreamPoller
 from cloudlydev.cron import LambdaCronRunner
 
 
-def _parse_config(config_path):
-    if os.path.exists(config_path):
-        with open(config_path) as f:
-            return yaml.safe_load(f)
-    return {}
-
-
 class LambdaImporter:
-    def load_handler(self, config, root="lambdas", python_version="3.11"):
-        handler = config.get("handler") or self.Meta.default_handler
-        function_path = config["path"]
+    def load_handler(self, function: LambdaFunction):
+        handler = function.handler
+        function_path = function.path
+        root = function.root
         project_name = os.path.basename(function_path)
-        python_version = config.get("python_version") or python_version
+        python_version = function.python_version
 
         module_name, func_name = handler.split(".")
         handler_module_path = os.path.join(
@@ -49,7 +44,7 @@ class LambdaImporter:
             sys.path.insert(0, os.path.dirname(package))
 
         # We shoud also add the venv site-packages to the path
-        venv = config.get("venv")
+        venv = function.venv
         if not venv:
             venv_dir = os.path.join(os.path.dirname(package), ".venv")
             if not is_nested_folder_structure:
@@ -74,36 +69,33 @@ class LambdaImporter:
 
         return fn
 
-    class Meta:
-        default_handler = "handler.handler"
-
 
 class DevServer:
     def __init__(self, **kwargs):
         self._host = kwargs["host"]
         self._port = kwargs["port"]
-        self._config = _parse_config(kwargs["config"])
+        self._config = load_config(kwargs["config"])
         self._app = Bottle()
 
         self._old_path = sys.path
         self._old_modules = sys.modules
 
+        clients.configure(self._config)
+        clients.install()
+        clients.preload()
+
         lambda_importer = LambdaImporter()
         print("Mapping routes... from ", kwargs["config"])
-        for route in self._config["routes"]:
+        for route in self._config.routes:
             try:
-                http_method = route.get("method", "GET")
-                handler = lambda_importer.load_handler(
-                    route,
-                    root=self._config["root"],
-                    python_version=self._config.get("python_version", "3.11"),
-                )
+                http_method = route.method
+                handler = lambda_importer.load_handler(route.function)
                 self._app.route(
-                    route["url"],
+                    route.url,
                     method=(http_method, "OPTIONS"),
                     callback=self._bind_to_lambda(handler),
                 )
-                print(f"Mapped {http_method} {route['url']} to {handler.__name__}")
+                print(f"Mapped {http_method} {route.url} to {handler.__name__}")
             except Exception as e:
                 print("ERROR", e)
 
@@ -114,32 +106,24 @@ class DevServer:
         run(self._app, host=self._host, port=self._port, debug=True, reloader=True)
 
     def _start_cron_jobs(self):
-        cron = self._config.get("cron", [])
+        cron = self._config.cron
         if not cron:
             return
 
         # Group cron jobs by interval
         cron_jobs_by_interval = defaultdict(list)
         for job in cron:
-            cron_jobs_by_interval[job.get("interval", "1m")].append(job)
+            cron_jobs_by_interval[job.interval].append(job)
 
         for interval, jobs in cron_jobs_by_interval.items():
             cron_jobs = []
             for job in jobs:
-                py_version = job.get("python_version", "3.11") or self._config.get(
-                    "python_version", "3.11"
-                )
-
                 try:
-                    print(f"Binding {job['path']} to cron job")
-                    handler = LambdaImporter().load_handler(
-                        job,
-                        root=self._config["root"],
-                        python_version=py_version,
-                    )
+                    print(f"Binding {job.function.path} to cron job")
+                    handler = LambdaImporter().load_handler(job.function)
                     cron_jobs.append(handler)
                 except Exception as e:
-                    print(f"ERROR: {job['path']} failed to load", e)
+                    print(f"ERROR: {job.function.path} failed to load", e)
 
             if not cron_jobs:
                 continue
@@ -150,43 +134,28 @@ class DevServer:
             thread.start()
 
     def _start_dynamodb_stream(self):
-        table = self._config.get("table")
-        if not table or not table.get("stream"):
-            return
-
-        stream_config = table["stream"]
-        if not stream_config.get("enabled"):
-            return
-
-        bindings = stream_config.get("bindings", [])
-        if not bindings:
-            return
-
-        bound_handlers = []
-        for binding in bindings:
-            py_version = binding.get("python_version", "3.11") or self._config.get(
-                "python_version", "3.11"
-            )
+        for table in self._config.tables:
+            stream = table.stream
+            if not stream or not stream.enabled or not stream.bindings:
+                continue
 
-            try:
-                print(f"Binding {binding['path']} to DynamoDB stream")
-                handler = LambdaImporter().load_handler(
-                    binding,
-                    root=self._config["root"],
-                    python_version=py_version,
-                )
-                bound_handlers.append(handler)
-            except Exception as e:
-                print(f"ERROR: {binding['path']} failed to load", e)
+            bound_handlers = []
+            for binding in stream.bindings:
+                try:
+                    print(f"Binding {binding.path} to DynamoDB stream")
+                    handler = LambdaImporter().load_handler(binding)
+                    bound_handlers.append(handler)
+                except Exception as e:
+                    print(f"ERROR: {binding.path} failed to load", e)
 
-        if not bound_handlers:
-            return
+            if not bound_handlers:
+                continue
 
-        poller = DynamoStreamPoller(table["name"])
+            poller = DynamoStreamPoller(table.name)
 
-        # Run in a new thread
-        thread = Thread(target=poller.poll, args=(bound_handlers,))
-        thread.start()
+            # Run in a new thread
+            thread = Thread(target=poller.poll, args=(bound_handlers,))
+            thread.start()
 
     def handle_request(self, *args, **kwargs):
         return (
@@ -232,7 +201,7 @@ class DevServer:
             if request.method == "OPTIONS":
                 return self._handle_cors_request(*args, **kwargs)
 
-            user = self._config.get("user", {})
+            user = self._config.user
             body = request.body.read().decode("utf-8")
             event = {
                 "path": request.path,
@@ -246,9 +215,7 @@ class DevServer:
                             "claims": {
                                 "cognito:groups": f'[{" ".join(user.get("groups", []))}]',
                                 "username": user.get("username"),
-                                "client_id": self._config.get(
-                                    "client_id", "testclientid"
-                                ),
+                                "client_id": self._config.client_id,
                             }
                         }
                     },
@@ -316,15 +283,14 @@ def initialize_lambdas(config):
 
     # Change poetry to use local venvs
     os.system("poetry config virtualenvs.in-project true")
-    root = os.path.abspath(config["root"])
-    all_lambdas = (
-        config["routes"]
-        + config.get("cron", [])
-        + config.get("stream", {}).get("bindings", [])
+
+    # The same lambda can back several routes, only initialize it once
+    lambda_paths = dict.fromkeys(
+        os.path.abspath(os.path.join(function.root, function.path))
+        for function in config.functions()
     )
 
-    for route in all_lambdas:
-        lambda_path = os.path.join(root, route["path"])
+    for lambda_path in lambda_paths:
         if os.path.exists(lambda_path):
             print(f"Initializing lambda {lambda_path}")
             os.chdir(lambda_path)
@@ -337,13 +303,25 @@ def initialize_lambdas(config):
 def init(**kwargs):
     sample_config = """
     root: lambdas # root folder for lambdas (required)
-    python: 3.11 # python version to use (default 3.11)
+    python_version: "3.11" # python version to use, quoted (default 3.11)
+    # include: # other Cloudlyfiles to merge, each with its own root (optional)
+    #   - services/orders/Cloudlyfile.yml
     routes:
       - path: hello/hello # path to lambda handler relative to root (required)
         url: /hello # url to map to lambda (required)
         method: GET # http method to map to default GET
         handler: handler.handler # handler to map to (default handler.handler)
         # venv: full/path/to/.venv # optional (default path/../.venv)
+    # table: # DynamoDB table created by initdb (optional)
+    #   name: my-table
+    #   key:
+    #     - pk: pk
+    #       type: S
+    # tables: # more tables, same fields as table (optional)
+    #   - name: audit-log
+    #     key:
+    #       - pk: id
+    #         type: S
 
     """
 
@@ -373,17 +351,22 @@ def main():
     elif args.command == "initdb":
         from cloudlydev.dynamodb import reset_db
 
-        reset_db(_parse_config(args.config), force=args.force)
+        config = load_config(args.config)
+        clients.configure(config)
+        reset_db(config, force=args.force)
     elif args.command == "loaddata":
         from cloudlydev.dynamodb import load_data
 
+        if os.path.exists(args.config):
+            clients.configure(load_config(args.config))
+
         print(f"Loading data from {args.file} into {args.table}")
-        data = _parse_config(args.file)
+        data = load_yaml(args.file)
         load_data(args.table, data.get("records", []))
         print("Done!")
 
     elif args.command == "initlambda":
-        initialize_lambdas(_parse_config(args.config))
+        initialize_lambdas(load_config(args.config))
     else:
         print(f"Unknown command {args.command}")
 
@@ -0,0 +1,98 @@
+import json
+
+import boto3
+import pytest
+from botocore.awsrequest import AWSResponse
+
+from cloudlydev.aws_clients import ClientFactory
+from cloudlydev.config import Config
+
+
+DYNAMODB_ENDPOINT = "http://localhost:8001"
+
+
+class _RawBody:
+    def __init__(self, body):
+        self._body = body
+
+    def stream(self, **kwargs):
+        yield self._body
+
+
+@pytest.fixture
+def factory(monkeypatch):
+    monkeypatch.setenv("AWS_DEFAULT_REGION", "us-east-1")
+    monkeypatch.setenv("AWS_ACCESS_KEY_ID", "test")
+    monkeypatch.setenv("AWS_SECRET_ACCESS_KEY", "test")
+    monkeypatch.setattr(boto3, "DEFAULT_SESSION", None)
+
+    factory = ClientFactory()
+    factory.configure(
+        Config(
+            endpoints={
+                "dynamodb": DYNAMODB_ENDPOINT,
+                "s3": "http://localhost:4566",
+            }
+        )
+    )
+    factory.install()
+    yield factory
+    factory.uninstall()
+
+
+def test_clients_are_cached_per_service_region_and_endpoint(factory):
+    sqs = factory.client("sqs")
+
+    assert factory.client("sqs") is sqs
+    assert factory.client("sqs", region_name="us-east-1") is sqs
+    assert factory.client("sqs", region_name="eu-west-1") is not sqs
+    assert factory.client("sqs", endpoint_url="http://localhost:9324") is not sqs
+    assert factory.client("sns") is not sqs
+
+
+def test_listed_services_use_their_local_endpoint(factory):
+    assert boto3.client("dynamodb").meta.endpoint_url == DYNAMODB_ENDPOINT
+    assert boto3.client("s3").meta.config.s3["addressing_style"] == "path"
+    assert factory.client("dynamodb").meta.endpoint_url == DYNAMODB_ENDPOINT
+
+
+def test_unlisted_services_and_explicit_endpoints_are_left_alone(factory):
+    sqs = boto3.client("sqs")
+    dynamodb = boto3.client("dynamodb", endpoint_url="http://localhost:9000")
+
+    assert sqs.meta.endpoint_url == "https://sqs.us-east-1.amazonaws.com"
+    assert sqs.meta.config.tcp_keepalive is True
+    assert dynamodb.meta.endpoint_url == "http://localhost:9000"
+
+
+def test_preload_builds_the_common_and_listed_clients(factory, monkeypatch):
+    factory.configure(Config(endpoints={"sns": "http://localhost:9911"}))
+    factory.preload()
+
+    def fail(*args, **kwargs):
+        raise AssertionError("preloaded clients should be reused")
+
+    monkeypatch.setattr(boto3.DEFAULT_SESSION, "client", fail)
+
+    for service_name in ("dynamodb", "s3", "sqs", "sns"):
+        factory.client(service_name)
+    assert factory.client("sns").meta.endpoint_url == "http://localhost:9911"
+
+
+def test_resource_calls_keep_their_type_serialization(factory):
+    sent = []
+
+    def capture(request, **kwargs):
+        sent.append(request)
+        return AWSResponse(request.url, 200, {}, _RawBody(b"{}"))
+
+    table = boto3.resource("dynamodb").Table("items")
+    table.meta.client.meta.events.register("before-send.dynamodb.PutItem", capture)
+
+    table.put_item(Item={"pk": "a", "count": 1})
+
+    assert sent[0].url == f"{DYNAMODB_ENDPOINT}/"
+    assert json.loads(sent[0].body)["Item"] == {
+        "pk": {"S": "a"},
+        "count": {"N": "1"},
+    }
@@ -0,0 +1,168 @@
+import os
+
+import pytest
+
+from cloudlydev import config as config_module
+from cloudlydev.config import ConfigError, load_config
+
+
+TABLE = """
+table:
+  name: {name}
+  key:
+    - pk: pk
+      type: S
+"""
+
+
+@pytest.fixture
+def project(tmp_path, monkeypatch):
+    monkeypatch.chdir(tmp_path)
+
+    def write(path, content):
+        full_path = tmp_path / path
+        full_path.parent.mkdir(parents=True, exist_ok=True)
+        full_path.write_text(content)
+        return full_path
+
+    return write
+
+
+def test_includes_are_merged_with_their_own_root(project, tmp_path):
+    project(
+        "Cloudlyfile.yml",
+        """
+root: lambdas
+include:
+  - services/orders/Cloudlyfile.yml
+routes:
+  - path: hello/hello
+    url: /hello
+""",
+    )
+    project(
+        "services/orders/Cloudlyfile.yml",
+        """
+root: functions
+python_version: "3.10"
+include: nested.yml
+endpoints:
+  sqs: http://localhost:9324
+routes:
+  - path: createOrder
+    url: /orders
+    method: POST
+cron:
+  - path: expireOrders
+    interval: 5m
+""",
+    )
+    project(
+        "services/orders/nested.yml",
+        """
+routes:
+  - path: getOrder
+    url: /orders/<id>
+""",
+    )
+
+    config = load_config("Cloudlyfile.yml")
+
+    orders_root = str(tmp_path / "services" / "orders" / "functions")
+    assert [(r.url, r.method) for r in config.routes] == [
+        ("/hello", "GET"),
+        ("/orders", "POST"),
+        ("/orders/<id>", "GET"),
+    ]
+    assert [(f.path, f.root, f.python_version) for f in config.functions()] == [
+        ("hello/hello", str(tmp_path / "lambdas"), "3.11"),
+        ("createOrder", orders_root, "3.10"),
+        ("getOrder", orders_root, "3.10"),
+        ("expireOrders", orders_root, "3.10"),
+    ]
+    assert config.endpoints == {"sqs": "http://localhost:9324"}
+
+
+def test_include_cycle_is_rejected(project):
+    project("Cloudlyfile.yml", "root: lambdas\ninclude: a.yml\n")
+    project("a.yml", "include: Cloudlyfile.yml\n")
+
+    with pytest.raises(ConfigError, match="includes itself"):
+        load_config("Cloudlyfile.yml")
+
+
+def test_shared_include_is_merged_once(project):
+    project(
+        "Cloudlyfile.yml",
+        "root: lambdas\ninclude: [a.yml, common.yml]\n" + TABLE.format(name="t1"),
+    )
+    project("a.yml", "include: common.yml\n")
+    project("common.yml", TABLE.format(name="shared"))
+
+    config = load_config("Cloudlyfile.yml")
+
+    assert [table.name for table in config.tables] == ["t1", "shared"]
+
+
+@pytest.mark.parametrize(
+    "python_version, expected",
+    [("3.9", "3.9"), ("3.11", "3.11"), ("3.12", "3.12"), ('"3.10"', "3.10")],
+)
+def test_python_version_can_be_unquoted_when_unambiguous(
+    project, python_version, expected
+):
+    project(
+        "Cloudlyfile.yml",
+        f"root: lambdas\npython_version: {python_version}\n"
+        "routes:\n  - path: hello\n    url: /hello\n",
+    )
+
+    config = load_config("Cloudlyfile.yml")
+
+    assert config.routes[0].function.python_version == expected
+
+
+@pytest.mark.parametrize(
+    "content",
+    [
+        "root: lambdas\nroutes:\n  path: hello\n",
+        "root: lambdas\nroutes:\n  - hello\n",
+        "root: lambdas\ninclude:\n  - 1\n",
+        "root: lambdas\npython_version: 3.10\n",
+        "root: lambdas\npython_version: 3\n",
+        "root: lambdas\ntable:\n  name: t1\n  key:\n    pk: pk\n",
+        "root: lambdas\n"
+        + TABLE.format(name="t1")
+        + "  indexes:\n    - key:\n        - pk: gsi1_pk\n",
+    ],
+)
+def test_invalid_config_raises_config_error(project, content):
+    project("Cloudlyfile.yml", content)
+
+    with pytest.raises(ConfigError, match="Cloudlyfile.yml"):
+        load_config("Cloudlyfile.yml")
+
+
+def test_unchanged_config_is_read_from_cache(project, monkeypatch):
+    project("Cloudlyfile.yml", "root: lambdas\ninclude: a.yml\n")
+    project("a.yml", "routes:\n  - path: hello\n    url: /hello\n")
+    first = load_config("Cloudlyfile.yml")
+
+    def fail(path):
+        raise AssertionError(f"{path} should not be parsed")
+
+    monkeypatch.setattr(config_module, "load_yaml", fail)
+
+    assert load_config("Cloudlyfile.yml") == first
+
+
+def test_cache_is_rebuilt_when_an_include_changes(project):
+    project("Cloudlyfile.yml", "root: lambdas\ninclude: a.yml\n")
+    fragment = project("a.yml", "routes:\n  - path: hello\n    url: /hello\n")
+    load_config("Cloudlyfile.yml")
+
+    fragment.write_text("routes:\n  - path: hello\n    url: /goodbye\n")
+    stat = os.stat(fragment)
+    os.utime(fragment, ns=(stat.st_atime_ns, stat.st_mtime_ns + 1_000_000_000))
+
+    assert [r.url for r in load_config("Cloudlyfile.yml").routes] == ["/goodbye"]